@@ -7,40 +7,144 @@ Real Settlement Tracker - NO fake wins/losses
 4. Calculate actual PnL only when market settles
 """
 
+import atexit
+import base64
+import hashlib
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import time
 import os
+import queue
 import sys
+import threading
+from array import array
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 
 sys.stdout.reconfigure(line_buffering=True)
 
+# orjson is 2-5x faster than stdlib json on the per-poll paths; optional
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
 # Configuration
 INITIAL_CAPITAL = 100.0
 MIN_EDGE = 0.03
+MAX_EDGE = 0.10
+BASE_EDGE = 0.02  # Edge for a fully efficient market (liquidity >= volume)
+INEFFICIENCY_EDGE = 0.05  # Extra edge for a fully illiquid market
+# Highest edge calculate_opportunity can return; the opportunity scan prunes on it
+EDGE_UPPER_BOUND = max(MIN_EDGE, min(BASE_EDGE + INEFFICIENCY_EDGE, MAX_EDGE))
+MIN_VOLUME = 50000
 POLL_INTERVAL = 30
+MAX_POLL_BACKOFF = 300  # Cap for exponential backoff after API errors
 MAX_TRADES_PER_HOUR = 5
+TRADE_COOLDOWN = 60  # Minimum seconds between trades
+STATUS_INTERVAL = 600  # Status report every 10 minutes
 SETTLEMENT_CHECK_INTERVAL = 60  # Check settlements every 60 seconds
+SETTLEMENT_WORKERS = 8  # Concurrent HTTP requests (settlement batches + market poll)
+SETTLEMENT_BATCH_SIZE = 50  # Market ids per bulk /markets request
+SETTLED_HISTORY_SIZE = 1000  # Settled trades kept in memory; trades_file holds the full log
+MARKET_PARSE_CACHE_TTL = 60  # Seconds to keep parses of markets no longer listed
 
 POLYMARKET_API = "https://gamma-api.polymarket.com"
 
+class MarketIdSet:
+    """Set of market IDs stored as fixed-width 64-bit hashes.
+    
+    Uses ~8 bytes per ID on disk instead of the full ID string; collisions are
+    negligible (2^-64 per pair) at the volumes this tracker trades.
+    """
+    
+    def __init__(self, ids=()):
+        self._keys = {self._key(i) for i in ids}
+    
+    @staticmethod
+    def _key(market_id) -> int:
+        digest = hashlib.blake2b(str(market_id).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'little')
+    
+    def add(self, market_id):
+        self._keys.add(self._key(market_id))
+    
+    def __contains__(self, market_id) -> bool:
+        return self._key(market_id) in self._keys
+    
+    def __len__(self) -> int:
+        return len(self._keys)
+    
+    def to_b64(self) -> str:
+        """Serialize as base64 of packed little-endian uint64 keys"""
+        packed = array('Q', sorted(self._keys))
+        if sys.byteorder != 'little':
+            packed.byteswap()
+        return base64.b64encode(packed.tobytes()).decode()
+    
+    @classmethod
+    def from_b64(cls, data: str) -> 'MarketIdSet':
+        packed = array('Q')
+        packed.frombytes(base64.b64decode(data))
+        if sys.byteorder != 'little':
+            packed.byteswap()
+        ids = cls()
+        ids._keys = set(packed)
+        return ids
+
 class RealSettlementTracker:
     def __init__(self):
         self.capital = INITIAL_CAPITAL
         self.available_capital = INITIAL_CAPITAL  # Capital not in open positions
-        self.open_positions = []  # Positions waiting for settlement
-        self.settled_trades = []  # Completed trades with real outcomes
+        self._open_by_market: Dict[str, dict] = {}  # market_id -> position awaiting settlement
+        self.settled_trades = deque(maxlen=SETTLED_HISTORY_SIZE)  # Recent completed trades with real outcomes
         self.start_time = datetime.now(timezone.utc)
+        self._start_time_iso = self.start_time.isoformat()
         self.last_trade_time = None
         self.hourly_trades = 0
-        self.last_hour_reset = datetime.now(timezone.utc)
-        self.traded_market_ids = set()
+        self.last_hour_reset = self.start_time
+        self.traded_market_ids = MarketIdSet()
+        # market id -> (last_seen, raw (volume, liquidity, outcomePrices), parsed (volume, liquidity, prices))
+        self._market_cache: Dict[str, Tuple[float, tuple, Tuple[float, float, Optional[tuple]]]] = {}
+        self._dirty = False  # State changed since last save_state
+        # Running aggregates over all settled trades (O(1) per save/status)
+        self._realized_pnl = 0.0
+        self._wins = 0
+        self._losses = 0
+        self._settled_count = 0
+        self.session = self._create_session()
+        # Shared pool for HTTP fan-out. Workers only run get_markets/get_markets_by_ids,
+        # which touch nothing but the session; all tracker state is mutated on the main thread
+        self._executor = ThreadPoolExecutor(max_workers=SETTLEMENT_WORKERS)
+        atexit.register(self._executor.shutdown, wait=False)
         
         os.makedirs('logs', exist_ok=True)
         self.state_file = 'logs/real_settlement_state.json'
         self.trades_file = 'logs/real_settlement_trades.jsonl'
+        self._trades_fp = open(self.trades_file, 'ab', buffering=1 << 16)
+        # A crash mid-write can leave a partial last line; terminate it so new records start clean
+        if os.path.getsize(self.trades_file) > 0:
+            with open(self.trades_file, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    self._trades_fp.write(b'\n')
+        atexit.register(self._trades_fp.close)
+        
+        # State snapshots are written by a background thread; maxsize=1 coalesces bursts
+        self._state_queue = queue.Queue(maxsize=1)
+        self._state_thread = threading.Thread(target=self._state_writer, daemon=True)
+        self._state_thread.start()
+        atexit.register(self._stop_state_writer)
         
         # Load existing state if available
         self.load_state()
@@ -49,108 +153,249 @@ class RealSettlementTracker:
         self.log("📊 REAL SETTLEMENT TRACKER")
         self.log("   NO FAKE WINS/LOSSES - Tracks real outcomes only")
         self.log(f"   Capital: ${self.capital:.2f}")
-        self.log(f"   Open Positions: {len(self.open_positions)}")
+        self.log(f"   Open Positions: {len(self._open_by_market)}")
         self.log("=" * 60)
     
+    @property
+    def open_positions(self) -> List[dict]:
+        """Positions waiting for settlement"""
+        return list(self._open_by_market.values())
+    
+    def _create_session(self) -> requests.Session:
+        """HTTP session with keep-alive and connection pooling"""
+        session = requests.Session()
+        retry = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+        session.mount("https://", adapter)
+        session.headers.update({
+            "Accept": "application/json",
+            "Connection": "keep-alive",
+            "User-Agent": "settlement-tracker/1.0",
+        })
+        return session
+    
     def log(self, msg: str):
-        now = datetime.now(timezone.utc).strftime('%H:%M:%S')
+        now = time.strftime('%H:%M:%S', time.gmtime())
         print(f"[{now}] {msg}", flush=True)
     
     def load_state(self):
-        """Load existing state from file"""
+        """Load existing state from file
+        
+        The state file is authoritative. The trade log is flushed before the
+        background writer saves the matching snapshot, so after a crash the log
+        can run ahead of the state file (see save_state).
+        """
         try:
             if os.path.exists(self.state_file):
-                with open(self.state_file, 'r') as f:
-                    state = json.load(f)
+                with open(self.state_file, 'rb') as f:
+                    state = json_loads(f.read())
                     self.capital = state.get('capital', INITIAL_CAPITAL)
                     self.available_capital = state.get('available_capital', INITIAL_CAPITAL)
-                    self.open_positions = state.get('open_positions', [])
-                    self.settled_trades = state.get('settled_trades', [])
-                    self.traded_market_ids = set(state.get('traded_market_ids', []))
-                    self.log(f"📂 Loaded state: {len(self.open_positions)} open, {len(self.settled_trades)} settled")
+                    self._open_by_market = {
+                        p.get('market_id'): p for p in state.get('open_positions', [])
+                    }
+                    traded = state.get('traded_market_ids', [])
+                    if isinstance(traded, str):
+                        self.traded_market_ids = MarketIdSet.from_b64(traded)
+                    else:  # Older state files store the raw ID list
+                        self.traded_market_ids = MarketIdSet(traded)
+                    self._realized_pnl = state.get('realized_pnl', 0.0)
+                    self._wins = state.get('wins', 0)
+                    self._losses = state.get('losses', 0)
+                    self._settled_count = state.get('settled_trades_count', 0)
+                    self.settled_trades = self.load_settled_history()
+                    self.log(f"📂 Loaded state: {len(self._open_by_market)} open, {self._settled_count} settled")
         except Exception as e:
             self.log(f"⚠️ Could not load state: {e}")
     
-    def save_state(self):
-        """Save current state"""
-        realized_pnl = sum(t.get('pnl', 0) for t in self.settled_trades)
-        unrealized_value = sum(p.get('position_size', 0) for p in self.open_positions)
+    def load_settled_history(self) -> deque:
+        """Rehydrate recent settled trades by tailing the trade log
+        
+        SETTLED lines for positions the state file still holds as open were
+        written after the last saved snapshot. Skip them: check_settlements
+        will settle those positions again against the restored capital.
+        """
+        settled = deque(maxlen=SETTLED_HISTORY_SIZE)
+        if not os.path.exists(self.trades_file):
+            return settled
+        # Log holds an OPEN and a SETTLED line per trade, so tail twice the history size
+        with open(self.trades_file, 'rb') as f:
+            for line in deque(f, maxlen=2 * SETTLED_HISTORY_SIZE):
+                try:
+                    trade = json_loads(line)
+                except ValueError:
+                    continue  # Partial line from a crash mid-write
+                if not isinstance(trade, dict) or trade.get('status') != 'SETTLED':
+                    continue
+                if trade.get('market_id') in self._open_by_market:
+                    continue  # Log ran ahead of the state file
+                settled.append(trade)
+        return settled
+    
+    def _build_state(self) -> dict:
+        """Snapshot current state (copies, safe to serialize off-thread)"""
+        unrealized_value = sum(p.get('position_size', 0) for p in self._open_by_market.values())
         
-        state = {
+        return {
             'mode': 'REAL_SETTLEMENT_TRACKER',
             'capital': round(self.capital, 2),
             'available_capital': round(self.available_capital, 2),
             'initial_capital': INITIAL_CAPITAL,
-            'realized_pnl': round(realized_pnl, 2),
+            'realized_pnl': round(self._realized_pnl, 2),
             'unrealized_positions': round(unrealized_value, 2),
-            'open_positions_count': len(self.open_positions),
-            'settled_trades_count': len(self.settled_trades),
-            'wins': sum(1 for t in self.settled_trades if t.get('pnl', 0) > 0),
-            'losses': sum(1 for t in self.settled_trades if t.get('pnl', 0) < 0),
-            'start_time': self.start_time.isoformat(),
+            'open_positions_count': len(self._open_by_market),
+            'settled_trades_count': self._settled_count,
+            'wins': self._wins,
+            'losses': self._losses,
+            'start_time': self._start_time_iso,
             'last_update': datetime.now(timezone.utc).isoformat(),
-            'open_positions': self.open_positions,
-            'recent_settled': self.settled_trades[-5:],
-            'traded_market_ids': list(self.traded_market_ids)
+            # Positions are mutated in place on settlement, so copy them
+            'open_positions': [dict(p) for p in self._open_by_market.values()],
+            'recent_settled': list(islice(reversed(self.settled_trades), 5))[::-1],
+            'traded_market_ids': self.traded_market_ids.to_b64()
         }
+    
+    def save_state(self):
+        """Queue current state for the background writer
         
-        with open(self.state_file, 'w') as f:
-            json.dump(state, f, indent=2)
+        The trade log is flushed here, synchronously, but the snapshot lands
+        later. A crash in between leaves the log ahead of the state file;
+        load_state reconciles by trusting the state file.
+        """
+        snapshot = self._build_state()
+        try:
+            self._state_queue.put_nowait(snapshot)
+        except queue.Full:
+            # Writer is behind - replace the pending snapshot with the newer one
+            try:
+                self._state_queue.get_nowait()
+            except queue.Empty:
+                pass
+            self._state_queue.put_nowait(snapshot)
+        self._trades_fp.flush()
+        self._dirty = False
+    
+    def _state_writer(self):
+        """Background thread: write queued snapshots until a None sentinel"""
+        while True:
+            state = self._state_queue.get()
+            if state is None:
+                return
+            try:
+                # Write to temp file and swap in, so a crash never leaves a torn state file
+                tmp_file = self.state_file + '.tmp'
+                with open(tmp_file, 'wb') as f:
+                    f.write(json_dumps(state))
+                os.replace(tmp_file, self.state_file)
+            except Exception as e:
+                self.log(f"⚠️ Could not save state: {e}")
+    
+    def _stop_state_writer(self):
+        """Let the writer finish any pending snapshot, then stop it"""
+        self._state_queue.put(None)
+        self._state_thread.join(timeout=5)
     
     def log_trade(self, trade: dict):
-        """Append trade to log file"""
-        with open(self.trades_file, 'a') as f:
-            f.write(json.dumps(trade) + '\n')
+        """Append trade to log file (buffered, flushed in save_state)"""
+        self._trades_fp.write(json_dumps(trade) + b'\n')
     
     def get_markets(self) -> List[dict]:
         """Get active markets"""
         try:
-            resp = requests.get(
+            resp = self.session.get(
                 f"{POLYMARKET_API}/markets",
                 params={"closed": "false", "limit": 100},
                 timeout=15
             )
-            resp.raise_for_status()
-            return resp.json()
+            if resp.status_code != 200:
+                self.log(f"❌ API Error: HTTP {resp.status_code}")
+                return []
+            return json_loads(resp.content)
         except Exception as e:
             self.log(f"❌ API Error: {e}")
             return []
     
+    def get_markets_by_ids(self, ids: List[str]) -> Dict[str, dict]:
+        """Get closed markets for a batch of IDs in one request"""
+        if not ids:
+            return {}
+        try:
+            resp = self.session.get(
+                f"{POLYMARKET_API}/markets",
+                params=[("id", i) for i in ids] + [("closed", "true"), ("limit", len(ids))],
+                timeout=15
+            )
+            if resp.status_code != 200:
+                self.log(f"❌ API Error: HTTP {resp.status_code}")
+                return {}
+            return {str(m.get('id')): m for m in json_loads(resp.content)}
+        except Exception as e:
+            self.log(f"❌ API Error: {e}")
+            return {}
+    
     def get_market_by_id(self, market_id: str) -> Optional[dict]:
         """Get specific market by ID"""
         try:
-            resp = requests.get(
+            resp = self.session.get(
                 f"{POLYMARKET_API}/markets/{market_id}",
                 timeout=10
             )
-            if resp.status_code == 200:
-                return resp.json()
-        except:
-            pass
-        return None
+        except requests.RequestException:
+            return None
+        if resp.status_code != 200:
+            return None
+        try:
+            return json_loads(resp.content)
+        except ValueError:
+            return None
     
     def parse_prices(self, prices_raw) -> Optional[tuple]:
-        """Parse outcome prices"""
+        """Parse outcome prices (JSON string or list of two prices)"""
+        if isinstance(prices_raw, (str, bytes)):
+            if not prices_raw:
+                return None
+            try:
+                prices_raw = json_loads(prices_raw)
+            except ValueError:
+                return None
+        if not isinstance(prices_raw, (list, tuple)) or len(prices_raw) < 2:
+            return None
         try:
-            if isinstance(prices_raw, str):
-                prices = json.loads(prices_raw)
-            else:
-                prices = prices_raw
-            if len(prices) >= 2:
-                return float(prices[0]), float(prices[1])
-        except:
-            pass
-        return None
+            return float(prices_raw[0]), float(prices_raw[1])
+        except (TypeError, ValueError):
+            return None
     
-    def calculate_opportunity(self, market: dict) -> Optional[dict]:
-        """Find trading opportunity"""
+    def parse_market(self, market: dict) -> Tuple[float, float, Optional[tuple]]:
+        """Parse volume, liquidity and prices (cached per market ID while raw fields are unchanged)"""
+        market_id = market.get('id')
+        now = time.monotonic()
+        raw = (market.get('volume'), market.get('liquidity'), market.get('outcomePrices'))
+        cached = self._market_cache.get(market_id)
+        if cached and cached[1] == raw:
+            self._market_cache[market_id] = (now, raw, cached[2])
+            return cached[2]
+        
         volume = float(market.get('volume', 0) or 0)
         liquidity = float(market.get('liquidity', 0) or 0)
+        # Prices are only needed for markets that pass the volume filter
+        prices = self.parse_prices(market.get('outcomePrices')) if volume >= MIN_VOLUME else None
+        parsed = (volume, liquidity, prices)
+        
+        if market_id is not None:
+            self._market_cache[market_id] = (now, raw, parsed)
+        return parsed
+    
+    def calculate_opportunity(self, market: dict) -> Optional[dict]:
+        """Find trading opportunity"""
+        volume, liquidity, prices = self.parse_market(market)
         
-        if volume < 50000:
+        if volume < MIN_VOLUME:
             return None
         
-        prices = self.parse_prices(market.get('outcomePrices'))
         if not prices:
             return None
         
@@ -161,8 +406,8 @@ class RealSettlementTracker:
         
         # Simple edge based on market inefficiency
         market_efficiency = min(liquidity / volume, 1.0) if volume > 0 else 0
-        edge = 0.02 + (1 - market_efficiency) * 0.05
-        edge = max(MIN_EDGE, min(edge, 0.10))
+        edge = BASE_EDGE + (1 - market_efficiency) * INEFFICIENCY_EDGE
+        edge = max(MIN_EDGE, min(edge, MAX_EDGE))
         
         if edge < MIN_EDGE:
             return None
@@ -185,40 +430,67 @@ class RealSettlementTracker:
     
     def find_opportunity(self, markets: List[dict]) -> Optional[dict]:
         """Find best opportunity"""
-        opportunities = []
+        # Drop parsed entries for markets not seen recently
+        cutoff = time.monotonic() - MARKET_PARSE_CACHE_TTL
+        self._market_cache = {
+            k: v for k, v in self._market_cache.items() if v[0] >= cutoff
+        }
         
+        # Branch and bound: visit markets by volume, highest first. No market can
+        # score above EDGE_UPPER_BOUND * volume**0.2, so stop once that bound can't win.
+        # Only volume is read here; prices are parsed inside the pruned loop.
+        candidates = []
         for market in markets:
             market_id = market.get('id')
-            if market_id in self.traded_market_ids:
+            if market_id is None or market_id in self.traded_market_ids:
                 continue
+            volume = float(market.get('volume', 0) or 0)
+            if volume >= MIN_VOLUME:
+                candidates.append((volume, market))
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        
+        best_market = None
+        best_opp = None
+        best_score = float('-inf')
+        
+        for volume, market in candidates:
+            if EDGE_UPPER_BOUND * (volume ** 0.2) <= best_score:
+                break
             
             opp = self.calculate_opportunity(market)
-            if opp:
-                opportunities.append({
-                    'market': market,
-                    **opp
-                })
+            if not opp:
+                continue
+            
+            score = opp['edge'] * (opp['volume'] ** 0.2)
+            if score > best_score:
+                best_market, best_opp, best_score = market, opp, score
         
-        if not opportunities:
+        if best_opp is None:
             return None
         
-        return max(opportunities, key=lambda x: x['edge'] * (x['volume'] ** 0.2))
+        return {'market': best_market, **best_opp}
     
-    def open_position(self, opp: dict) -> Optional[dict]:
-        """Open a position (record entry, NO outcome simulation)"""
-        now = datetime.now(timezone.utc)
-        
-        # Rate limiting
-        if self.last_trade_time:
-            elapsed = (now - self.last_trade_time).total_seconds()
-            if elapsed < 60:
-                return None
-        
-        if (now - self.last_hour_reset).total_seconds() > 3600:
+    def trade_wait_seconds(self, now: datetime) -> float:
+        """Seconds until rate limits allow another trade (0 = trade allowed now)"""
+        if (now - self.last_hour_reset).total_seconds() >= 3600:
             self.hourly_trades = 0
             self.last_hour_reset = now
         
+        wait = 0.0
+        if self.last_trade_time:
+            wait = TRADE_COOLDOWN - (now - self.last_trade_time).total_seconds()
+        
         if self.hourly_trades >= MAX_TRADES_PER_HOUR:
+            wait = max(wait, 3600 - (now - self.last_hour_reset).total_seconds())
+        
+        return max(0.0, wait)
+    
+    def open_position(self, opp: dict, now: Optional[datetime] = None) -> Optional[dict]:
+        """Open a position (record entry, NO outcome simulation)"""
+        now = now or datetime.now(timezone.utc)
+        
+        # Rate limiting
+        if self.trade_wait_seconds(now) > 0:
             return None
         
         # Position sizing
@@ -252,7 +524,8 @@ class RealSettlementTracker:
         self.last_trade_time = now
         self.hourly_trades += 1
         self.traded_market_ids.add(market.get('id'))
-        self.open_positions.append(position)
+        self._open_by_market[market.get('id')] = position
+        self._dirty = True
         
         self.log("=" * 50)
         self.log(f"📝 POSITION OPENED: {position['id']}")
@@ -265,20 +538,29 @@ class RealSettlementTracker:
         self.log("=" * 50)
         
         self.log_trade(position)
-        self.save_state()
         return position
     
-    def check_settlements(self):
+    def check_settlements(self, now: Optional[datetime] = None):
         """Check if any open positions have settled"""
-        if not self.open_positions:
+        if not self._open_by_market:
             return
         
-        self.log(f"🔍 Checking {len(self.open_positions)} open positions...")
+        self.log(f"🔍 Checking {len(self._open_by_market)} open positions...")
         
-        for i, pos in enumerate(self.open_positions[:]):  # Copy list for safe iteration
-            market_id = pos.get('market_id')
-            market = self.get_market_by_id(market_id)
-            
+        positions = dict(self._open_by_market)  # Copy for safe iteration while settling
+        market_ids = [str(market_id) for market_id in positions]
+        batches = [
+            market_ids[i:i + SETTLEMENT_BATCH_SIZE]
+            for i in range(0, len(market_ids), SETTLEMENT_BATCH_SIZE)
+        ]
+        
+        # One bulk request per batch, batches fetched concurrently
+        markets = {}
+        for batch in self._executor.map(self.get_markets_by_ids, batches):
+            markets.update(batch)
+        
+        for market_id, pos in positions.items():
+            market = markets.get(str(market_id))
             if not market:
                 continue
             
@@ -288,11 +570,11 @@ class RealSettlementTracker:
             
             if resolved and resolved_outcome:
                 # Market has settled!
-                self.settle_position(pos, resolved_outcome)
+                self.settle_position(pos, resolved_outcome, now)
     
-    def settle_position(self, position: dict, resolved_outcome: str):
+    def settle_position(self, position: dict, resolved_outcome: str, now: Optional[datetime] = None):
         """Settle a position with REAL outcome"""
-        now = datetime.now(timezone.utc)
+        now = now or datetime.now(timezone.utc)
         
         # Determine if we won
         our_side = position.get('side')
@@ -321,10 +603,15 @@ class RealSettlementTracker:
         position['settled_at'] = now.isoformat()
         position['won'] = won
         position['pnl'] = round(pnl, 2)
+        self._realized_pnl += position['pnl']
+        self._wins += int(position['pnl'] > 0)
+        self._losses += int(position['pnl'] < 0)
+        self._settled_count += 1
         
         # Move to settled trades
-        self.open_positions.remove(position)
+        del self._open_by_market[position['market_id']]
         self.settled_trades.append(position)
+        self._dirty = True
         
         emoji = "✅" if won else "❌"
         self.log("")
@@ -338,15 +625,14 @@ class RealSettlementTracker:
         self.log("")
         
         self.log_trade(position)
-        self.save_state()
     
     def print_status(self):
         """Print current status"""
-        realized_pnl = sum(t.get('pnl', 0) for t in self.settled_trades)
-        wins = sum(1 for t in self.settled_trades if t.get('pnl', 0) > 0)
-        losses = sum(1 for t in self.settled_trades if t.get('pnl', 0) < 0)
-        total = len(self.settled_trades)
-        unrealized = sum(p.get('position_size', 0) for p in self.open_positions)
+        realized_pnl = self._realized_pnl
+        wins = self._wins
+        losses = self._losses
+        total = self._settled_count
+        unrealized = sum(p.get('position_size', 0) for p in self._open_by_market.values())
         
         self.log("")
         self.log("=" * 60)
@@ -357,7 +643,7 @@ class RealSettlementTracker:
         self.log(f"   Available: ${self.available_capital:.2f}")
         self.log(f"   In Positions: ${unrealized:.2f}")
         self.log("")
-        self.log(f"   Open Positions: {len(self.open_positions)}")
+        self.log(f"   Open Positions: {len(self._open_by_market)}")
         self.log(f"   Settled Trades: {total}")
         if total > 0:
             self.log(f"   Realized PnL: ${realized_pnl:+.2f}")
@@ -370,43 +656,65 @@ class RealSettlementTracker:
         end_time = self.start_time + timedelta(hours=duration_hours)
         last_status = self.start_time
         last_settlement_check = self.start_time
+        backoff = 0  # Extra poll delay after API errors
         
         self.log(f"🏃 Running for {duration_hours} hours...")
         self.log("   Will track REAL settlements only - no fake outcomes")
         
-        while datetime.now(timezone.utc) < end_time:
+        now = datetime.now(timezone.utc)
+        while now < end_time:
             try:
-                now = datetime.now(timezone.utc)
+                # Look for new opportunities - skip polling while rate limits block trading.
+                # The poll runs in the background so it overlaps the settlement check.
+                trade_wait = self.trade_wait_seconds(now)
+                markets_future = self._executor.submit(self.get_markets) if trade_wait == 0 else None
                 
                 # Check settlements periodically
                 if (now - last_settlement_check).total_seconds() >= SETTLEMENT_CHECK_INTERVAL:
-                    self.check_settlements()
+                    self.check_settlements(now)
                     last_settlement_check = now
                 
-                # Look for new opportunities
-                markets = self.get_markets()
-                if markets:
-                    opp = self.find_opportunity(markets)
-                    if opp:
-                        self.open_position(opp)
+                if markets_future is not None:
+                    markets = markets_future.result()
+                    if markets:
+                        backoff = 0
+                        opp = self.find_opportunity(markets)
+                        if opp:
+                            self.open_position(opp, now)
+                    else:
+                        backoff = min(max(backoff * 2, POLL_INTERVAL), MAX_POLL_BACKOFF)
                 
                 # Status report every 10 minutes
-                if (now - last_status).total_seconds() >= 600:
+                if (now - last_status).total_seconds() >= STATUS_INTERVAL:
                     self.print_status()
                     last_status = now
                 
-                self.save_state()
-                time.sleep(POLL_INTERVAL)
+                # Opens/settlements only mark state dirty; persist once per iteration
+                if self._dirty:
+                    self.save_state()
+                
+                if trade_wait > 0:
+                    # Wake for whichever comes first: trade slot, settlement check, status
+                    next_settlement = SETTLEMENT_CHECK_INTERVAL - (now - last_settlement_check).total_seconds()
+                    next_status = STATUS_INTERVAL - (now - last_status).total_seconds()
+                    time.sleep(max(1.0, min(trade_wait, next_settlement, next_status)))
+                else:
+                    time.sleep(max(POLL_INTERVAL, backoff))
                 
             except KeyboardInterrupt:
                 self.log("⏹️ Stopped")
                 break
             except Exception as e:
                 self.log(f"❌ Error: {e}")
-                time.sleep(POLL_INTERVAL)
+                backoff = min(max(backoff * 2, POLL_INTERVAL), MAX_POLL_BACKOFF)
+                time.sleep(backoff)
+            
+            now = datetime.now(timezone.utc)
         
+        if self._dirty:
+            self.save_state()
         self.print_status()
-        return self.settled_trades
+        return list(self.settled_trades)
 
 if __name__ == "__main__":
     import argparse